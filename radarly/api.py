@@ -12,10 +12,19 @@ To initialize a default API, simply run:
 """
 
 import json
-from datetime import datetime
-from os import getenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from functools import partial
+from hashlib import sha256
+from os import fdopen, getenv, replace, unlink
+from os.path import abspath, dirname, exists
+from tempfile import mkstemp
+import threading
+import time
+from types import MappingProxyType
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .auth import RadarlyAuth
 from .exceptions import (AuthenticationError, NoInitializedApi,
@@ -25,8 +34,18 @@ from .utils._internal import _parse_error_response
 from .utils.jsonparser import snake_dict as _decoder, _BLACKLIST_PATH
 from .utils.router import Router
 
+try:
+    import orjson
+    _dumps = partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = lambda content: json.loads(content.decode('utf-8'))
+
 __all__ = ['RadarlyApi']
 
+_DEFAULT_HEADERS = MappingProxyType({'Content-Type': 'application/json'})
+
 
 class RadarlyApi: # pylint: disable=R0902
     """Main interface with the Radarly API. It defines several methods in
@@ -65,6 +84,18 @@ class RadarlyApi: # pylint: disable=R0902
             initialization.
         rates (RateLimit): RateLimit object which can be used to know the
             current number of requests made and how many left you can do.
+        token_cache (str): path of a JSON file where the tokens are stored
+            between two sessions. If set, the tokens found in this file are
+            used instead of authenticating again to the API. Can be set at
+            initialization. Default to None (no cache).
+
+    The API keeps a ``requests.Session`` open in order to reuse the
+    connections to the Radarly servers between the requests. You can release
+    these connections with the ``close`` method or by using the API as a
+    context manager:
+
+    >>> with RadarlyApi(client_id=<client_id>, client_secret=<client_secret>) as api:
+    ...     api.get('users.json')
     """
     _default_api = None
 
@@ -78,7 +109,8 @@ class RadarlyApi: # pylint: disable=R0902
                  version='1.1',
                  router=None,
                  environment='prod',
-                 authenticate=True):
+                 authenticate=True,
+                 token_cache=None):
         client_id = client_id or getenv('RADARLY_CLIENT_ID')
         client_secret = client_secret or getenv('RADARLY_CLIENT_SECRET')
         if not(client_id and client_secret):
@@ -97,8 +129,18 @@ class RadarlyApi: # pylint: disable=R0902
         self.timeout = timeout
         self.proxies = proxies
         self.autorefresh = autorefresh
-        self.last_refresh = datetime.now()
+        self._last_refresh_mono = time.monotonic()
+        self.token_cache = token_cache
+        self._access_expires_mono = None
         self._auth = None
+        self._refresh_lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                              max_retries=0)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update(_DEFAULT_HEADERS)
+        self._url_prefix = None
         self.rates = RateLimit()
         self.scope = scope or [
             'listening',
@@ -108,12 +150,86 @@ class RadarlyApi: # pylint: disable=R0902
         self.environment = environment
         self.router = router or \
             type('Router', Router.__bases__, dict(Router.__dict__))
+        self._cache_key = self._build_cache_key() if token_cache else None
         if authenticate:
             self.authenticate()
 
     def __repr__(self):
         return '<RadarlyAPI.client_id={.client_id}>'.format(self)
 
+    @property
+    def version(self):
+        """Version of the API used to build the URLs of the requests."""
+        return self._version
+
+    @version.setter
+    def version(self, value):
+        self._version = value
+        self._url_prefix = None
+
+    @property
+    def environment(self):
+        """Environment of the API used to choose the host of the requests."""
+        return self._environment
+
+    @environment.setter
+    def environment(self, value):
+        self._environment = value
+        self._url_prefix = None
+        self._cache_key = None
+
+    @property
+    def router(self):
+        """Router storing the URLs used by the API."""
+        return self._router
+
+    @router.setter
+    def router(self, value):
+        self._router = value
+        self._url_prefix = None
+        self._cache_key = None
+
+    @property
+    def last_refresh(self):
+        """Date of the last refresh of the access token (or of the
+        initialization of the API if the token has never been refreshed).
+        The refresh time is stored with a monotonic clock and only converted
+        into a datetime when this attribute is read."""
+        elapsed = time.monotonic() - self._last_refresh_mono
+        return datetime.now() - timedelta(seconds=elapsed)
+
+    @last_refresh.setter
+    def last_refresh(self, value):
+        elapsed = (datetime.now() - value).total_seconds()
+        self._last_refresh_mono = time.monotonic() - elapsed
+
+    def _build_url_prefix(self):
+        """Compute the root URL and the prefix (root URL and version) added
+        to the relative URLs given to ``request``. The result is stored until
+        the version, the environment or the router is changed."""
+        self._root_url = self.router.host[self.environment]
+        if self.version:
+            self._url_prefix = self._root_url + '/' + self.version + '/'
+        else:
+            self._url_prefix = self._root_url + '/'
+        return self._url_prefix
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, '_session', None) is not None:
+            self.close()
+
+    def close(self):
+        """Close the HTTP session used by the API. All the connections kept
+        alive in the pool of the session are released."""
+        self._session.close()
+        return None
+
     @classmethod
     def init(cls, *args, **kwargs):
         """
@@ -160,7 +276,7 @@ class RadarlyApi: # pylint: disable=R0902
 
     def request(self, verb, url, **kwargs):
         """
-        Send a request using the request module. Some pre- and post-tasks
+        Send a request using the session of the API. Some pre- and post-tasks
         are computed each time in order to actualize the rates information
         and check whether or not the request is a success. This method uses
         the same parameters as request function of requests module so you can
@@ -175,38 +291,142 @@ class RadarlyApi: # pylint: disable=R0902
         Returns:
             dict: corresponds to the response data of the answer
         """
-        root_url = self.router.host[self.environment]
-        url = url.strip('/')
+        url, res = self._send(verb, url, **kwargs)
+        self.rates.update(url, res.headers)
+        return _decoder(_loads(res.content), blacklist=_BLACKLIST_PATH)
+
+    def iter_request(self, verb, url, json_path='hits.item', **kwargs):
+        """
+        Send a request in the same way as ``request`` but parse the response
+        incrementally with ``ijson`` and yield the items found at
+        ``json_path`` one by one. The response is never fully loaded in
+        memory, which is useful for requests returning a lot of items (for
+        example a search of publications). The ``ijson`` module must be
+        installed to use this method.
+
+        >>> items = api.iter_request('POST', url, data=parameter)
+        >>> for publication in items:
+        ...     print(publication['uid'])
+
+        Args:
+            verb (string): method used for the request
+            url (string): url to ask
+            json_path (string): ``ijson`` prefix of the items to yield.
+                Default to ``'hits.item'`` (publications of a search).
+            **kwargs: keywords arguments sent with request
+        Raises:
+            HTTP Error: raised if the request failed for an unknown cause
+        Yields:
+            dict: item of the response data of the answer
+        """
+        import ijson
+        path = [key for key in json_path.split('.') if key != 'item']
+        kwargs['stream'] = True
+        url, res = self._send(verb, url, **kwargs)
+        try:
+            res.raw.decode_content = True
+            for item in ijson.items(res.raw, json_path, use_float=True):
+                yield _decoder(item, blacklist=_BLACKLIST_PATH, path=path)
+        finally:
+            self.rates.update(url, res.headers)
+            res.close()
+
+    def iter_many(self, requests_spec, max_workers=8):
+        """
+        Send several requests concurrently with ``request`` and yield their
+        results as soon as they are available. The requests share the
+        connections pool of the API session. The results are yielded in the
+        order of completion, not in the order of ``requests_spec``.
+
+        >>> specs = [('GET', url, dict(params=dict(page=page)))
+        ...          for page in range(10)]
+        >>> for data in api.iter_many(specs):
+        ...     print(data)
+
+        Args:
+            requests_spec (list[tuple]): list of ``(verb, url, kwargs)``
+                describing each request.
+            max_workers (int): maximum number of requests sent at the same
+                time. Default to 8.
+        Raises:
+            HTTP Error: raised if one of the requests failed
+        Yields:
+            dict: response data of each request
+        """
         if self._auth is None:
             self.authenticate()
-        if self.version and not url.startswith(self.version) \
-            and not url.startswith(root_url):
-            url = '{}/{}'.format(self.version, url)
-        url = url if root_url in url  \
-            else '{}/{}'.format(root_url, url)
-        kwargs.setdefault('headers', {})
-        kwargs['headers'].setdefault('Content-Type', 'application/json')
-        if ('data' in kwargs and
-                kwargs['headers']['Content-Type'] == 'application/json'):
-            kwargs['data'] = json.dumps(kwargs['data'])
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(self.request, verb, url, **kwargs)
+                for verb, url, kwargs in requests_spec
+            ]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _send(self, verb, url, **kwargs):
+        """Build the full URL and the payload of a request, send it and
+        check its response. Returns the full URL and the response."""
+        url_prefix = self._url_prefix or self._build_url_prefix()
+        root_url = self._root_url
+        url = url.strip('/')
+        if self._auth is None:
+            with self._refresh_lock:
+                if self._auth is None:
+                    self.authenticate()
+        elif (self.autorefresh and self._access_expires_mono and
+              time.monotonic() >= self._access_expires_mono):
+            self._refresh_once()
+        if not url.startswith(root_url):
+            if self.version and url.startswith(self.version + '/'):
+                url = root_url + '/' + url
+            else:
+                url = url_prefix + url
+        if 'data' in kwargs:
+            headers = kwargs.get('headers') or _DEFAULT_HEADERS
+            content_type = headers.get('Content-Type',
+                                       _DEFAULT_HEADERS['Content-Type'])
+            if content_type == 'application/json':
+                kwargs['data'] = _dumps(kwargs['data'])
         kwargs.setdefault('timeout', self.timeout)
-        kwargs.setdefault('proxies', self.proxies)
-        if self.rates.is_reached(url):
+        if self.proxies:
+            kwargs.setdefault('proxies', self.proxies)
+        if not self.rates.acquire(url):
             raise RateReached('No more request available')
 
-        res = requests.request(verb, url, auth=self._auth, **kwargs)
+        kwargs.pop('auth', None)
+        used_token = self.access_token
+        res = self._session.request(verb, url, auth=self._auth, **kwargs)
 
         error_data = _parse_error_response(res)
         error_type = error_data.get('error_type', '')
         if self.autorefresh and error_type == 'ExpiredTokenException':
-            self.refresh()
-            res = requests.request(verb, url, auth=self._auth, **kwargs)
+            self._refresh_once(used_token)
+            res = self._session.request(verb, url, auth=self._auth, **kwargs)
+            error_data = None
         if not res.ok:
-            raise RadarlyHTTPError(response=res)
+            raise RadarlyHTTPError(response=res, parsed_response=error_data)
 
-        self.rates.update(url, res.headers)
+        return url, res
 
-        return _decoder(res.json(), blacklist=_BLACKLIST_PATH)
+    def _refresh_once(self, expired_token=None):
+        """Refresh the access token while holding a lock, so that several
+        threads finding an expired token only refresh it once. The expiration
+        is checked again inside the lock: if ``expired_token`` is given, the
+        token is only refreshed if it is still the current one; otherwise it
+        is refreshed if its expiration date has passed."""
+        with self._refresh_lock:
+            if expired_token is not None:
+                expired = self.access_token == expired_token
+            else:
+                expired = bool(self._access_expires_mono and
+                               time.monotonic() >= self._access_expires_mono)
+            if expired:
+                self.refresh()
+        return None
 
     def get(self, url, **kwargs):
         """Shortcut for the ``request`` method with 'GET' as verb.
@@ -254,12 +474,18 @@ class RadarlyApi: # pylint: disable=R0902
         (client_id, client_secret) will be used to generate an access_token
         and a refresh_token.
 
+        If a ``token_cache`` is set and stores a token which has not expired
+        for the same client_id and scope, this token is used and no request is
+        made.
+
         Raises:
             BadAuthentication: raised if client_id or client_secret is
                 incorrect
         Returns:
             None:
         """
+        if self._load_cached_tokens():
+            return None
         data = dict(
             client_id=self.client_id,
             client_secret=self.client_secret,
@@ -274,8 +500,7 @@ class RadarlyApi: # pylint: disable=R0902
             timeout=self.timeout
         )
         url = self.router.oauth[self.environment]
-        auth_response = requests.request('POST', url,
-                                         **kwargs)
+        auth_response = self._session.request('POST', url, **kwargs)
         try:
             auth_response.raise_for_status()
         except requests.exceptions.HTTPError:
@@ -283,9 +508,7 @@ class RadarlyApi: # pylint: disable=R0902
             raise AuthenticationError(auth_response.get('error'))
         auth_response = auth_response.json()
         self.scope = auth_response.get('scope', '').split(' ')
-        self.access_token = auth_response.get('access_token')
-        self.refresh_token = auth_response.get('refresh_token')
-        self._auth = RadarlyAuth(self.access_token)
+        self._set_tokens(auth_response)
         return None
 
     def refresh(self):
@@ -293,6 +516,12 @@ class RadarlyApi: # pylint: disable=R0902
         Refresh the access_token using the refresh_token as soon as the access
         token has expired. The auto-refresh behaviour can be ignored with
         the autorefresh attribute.
+
+        Raises:
+            AuthenticationError: raised if the OAuth server rejected the
+                refresh token
+        Returns:
+            None:
         """
         data = dict(
             client_id=self.client_id,
@@ -304,12 +533,116 @@ class RadarlyApi: # pylint: disable=R0902
             'Content-Type': 'application/x-www-form-urlencoded'
         }
         url = self.router.oauth[self.environment]
-        auth_response = requests.request('POST', url,
-                                         data=data, headers=headers,
-                                         proxies=self.proxies, timeout=self.timeout)
+        auth_response = self._session.request('POST', url,
+                                              data=data, headers=headers,
+                                              proxies=self.proxies,
+                                              timeout=self.timeout)
+        try:
+            auth_response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            auth_response = auth_response.json()
+            raise AuthenticationError(auth_response.get('error'))
         auth_response = auth_response.json()
+        if not auth_response.get('access_token'):
+            raise AuthenticationError(auth_response.get('error'))
+        self._set_tokens(auth_response)
+        self._last_refresh_mono = time.monotonic()
+        return None
+
+    def _set_tokens(self, auth_response):
+        """Store the tokens and the expiration date found in the response of
+        the OAuth server. The access token is considered expired a little
+        before its real expiration (60 seconds, or half of its lifetime for
+        short-lived tokens) in order to refresh it before the API rejects
+        it."""
         self.access_token = auth_response.get('access_token')
         self.refresh_token = auth_response.get('refresh_token')
-        self._auth = RadarlyAuth(self.access_token)
-        self.last_refresh = datetime.now()
+        self._set_auth()
+        expires_in = auth_response.get('expires_in')
+        if expires_in is None:
+            self._access_expires_mono = None
+        else:
+            expires_in = int(expires_in)
+            margin = min(60, expires_in // 2)
+            self._access_expires_mono = time.monotonic() + expires_in - margin
+        self._dump_cached_tokens()
+        return None
+
+    def _build_cache_key(self):
+        """Compute the key of the tokens of this client in the token cache.
+        The key depends on the OAuth server, the client_id and the scope."""
+        key = '\n'.join([
+            self.router.oauth[self.environment],
+            self.client_id,
+            ' '.join(self.scope),
+        ])
+        self._cache_key = sha256(key.encode('utf-8')).hexdigest()
+        return self._cache_key
+
+    def _set_auth(self):
+        """Update the authorization object with the current access token. The
+        same ``RadarlyAuth`` object is kept between two refreshes."""
+        if self._auth is None:
+            self._auth = RadarlyAuth(self.access_token)
+        else:
+            self._auth.set_token(self.access_token)
+        return None
+
+    def _read_token_cache(self):
+        """Read the content of the token cache file."""
+        if not (self.token_cache and exists(self.token_cache)):
+            return dict()
+        with open(self.token_cache, mode='r') as cache_file:
+            try:
+                return json.load(cache_file)
+            except ValueError:
+                return dict()
+
+    def _load_cached_tokens(self):
+        """Load the tokens stored in the token cache. Returns whether or not
+        some tokens which have not expired have been found."""
+        if not self.token_cache:
+            return False
+        cached = self._read_token_cache().get(
+            self._cache_key or self._build_cache_key()
+        )
+        if not (cached and cached.get('access_token')):
+            return False
+        expires_at = cached.get('expires_at')
+        if expires_at is not None:
+            expires_in = expires_at - time.time()
+            if expires_in <= 0:
+                return False
+            expires_at = time.monotonic() + expires_in
+        self.access_token = cached.get('access_token')
+        self.refresh_token = cached.get('refresh_token')
+        self._access_expires_mono = expires_at
+        self._set_auth()
+        return True
+
+    def _dump_cached_tokens(self):
+        """Store the current tokens in the token cache. The file is only
+        readable by its owner and is replaced atomically so that a concurrent
+        reader never sees a partially written cache."""
+        if not (self.token_cache and self.access_token):
+            return None
+        cache = self._read_token_cache()
+        expires_at = self._access_expires_mono
+        if expires_at is not None:
+            expires_at = time.time() + expires_at - time.monotonic()
+        cache[self._cache_key or self._build_cache_key()] = dict(
+            access_token=self.access_token,
+            refresh_token=self.refresh_token,
+            expires_at=expires_at,
+        )
+        file_descriptor, temp_path = mkstemp(
+            dir=dirname(abspath(self.token_cache)), suffix='.tmp'
+        )
+        try:
+            with fdopen(file_descriptor, mode='w') as cache_file:
+                json.dump(cache, cache_file)
+            replace(temp_path, self.token_cache)
+        except BaseException:
+            unlink(temp_path)
+            raise
         return None
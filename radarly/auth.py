@@ -23,12 +23,19 @@ class RadarlyAuth(AuthBase): # pylint: disable=R0903
     >>> requests.get(url_user, auth=auth)
     """
     def __init__(self, token):
-        self.token = token
+        self.set_token(token)
 
     def __call__(self, r):
-        r.headers['Authorization'] = 'Bearer {.token}'.format(self)
+        r.headers['Authorization'] = self._header
         return r
 
+    def set_token(self, token):
+        """Update the token used for the authentication. The Authorization
+        header is built once here instead of on each request."""
+        self.token = token
+        self._header = 'Bearer {}'.format(token)
+        return None
+
     def __repr__(self):
         token = truncate_repr(self.token)
         return '<RadarlyAuth.token={}.type=bearer>'.format(token)
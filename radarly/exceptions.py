@@ -38,10 +38,14 @@ class AuthenticationError(Exception):
 
 
 class RadarlyHTTPError(HTTPError):
-    """An HTTP error occured when querying the Radarly API"""
-    def __init__(self, *args, **kwargs):
+    """An HTTP error occured when querying the Radarly API. The parsed content
+    of the response can be given with the ``parsed_response`` argument if it
+    has already been computed."""
+    def __init__(self, *args, parsed_response=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.parsed_response = _parse_error_response(self.response)
+        if parsed_response is None:
+            parsed_response = _parse_error_response(self.response)
+        self.parsed_response = parsed_response
 
     def __str__(self):
         content = self.parsed_response.get('error_message') \
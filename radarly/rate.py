@@ -6,6 +6,9 @@ request's headers and store this rates.
 
 import copy
 import re
+import threading
+import time
+from functools import lru_cache
 
 from .utils.router import Router
 
@@ -26,45 +29,93 @@ class RateConf:
         Router.publication['raw'],
     ]
 
+    _patterns = None
+
+    @staticmethod
+    def into_pattern(path_url):
+        """Transform a string with format option into a compiled regular
+        expression"""
+        if isinstance(path_url, str):
+            format_pattern = r'{[a-zA-Z0-9_]*}'
+            path_url = re.sub(format_pattern, '[a-zA-Z0-9]*', path_url)
+            return re.compile(path_url)
+        elif isinstance(path_url, (list, tuple)):
+            return [RateConf.into_pattern(url) for url in path_url]
+        raise TypeError("'path_url' must be a string or a list")
+
     @classmethod
+    @lru_cache(maxsize=1024)
     def get_category(cls, url):
-        """Get the rate limit category of a URL.
+        """Get the rate limit category of a URL. The patterns are compiled
+        only once and the category of the last URLs is cached.
 
         Args:
             url (string):
         Returns:
             string: category for this URL ('slow', 'medium' or 'default')
         """
-        def into_pattern(path_url):
-            """Transform a string with format option into a compiled regular
-            expression"""
-            if isinstance(path_url, str):
-                format_pattern = r'{[a-zA-Z0-9_]*}'
-                path_url = re.sub(format_pattern, '[a-zA-Z0-9]*', path_url)
-                return re.compile(path_url)
-            elif isinstance(path_url, (list, tuple)):
-                return [into_pattern(url) for url in path_url]
-            raise TypeError("'path_url' must be a string or a list")
-        match_slow = any(
-            [item.search(url) for item in into_pattern(cls.slow)]
-        )
-        match_medium = any(
-            [item.search(url) for item in into_pattern(cls.medium)]
-        )
-        if match_slow:
-            return 'slow'
-        elif match_medium:
-            return 'medium'
-        return 'default'
+        if cls._patterns is None:
+            cls._patterns = (
+                ('slow', cls.into_pattern(cls.slow)),
+                ('medium', cls.into_pattern(cls.medium)),
+            )
+        category = 'default'
+        for name, patterns in cls._patterns:
+            if any(item.search(url) for item in patterns):
+                category = name
+                break
+        return category
 
 
 class RateLimit:
-    """Object which will count the remaining request"""
+    """Object which will count the remaining request. The remaining requests
+    of each category are estimated with a token bucket: the bucket is
+    refilled continuously over the rate limit window (15 minutes) of the API
+    and reconciled with the rates returned by the server in the headers of
+    each response. When the server says that no request is left, the bucket
+    stays empty until the reset time sent by the server and is then refilled
+    to the limit. The buckets can be shared between several threads."""
+    window = 15 * 60
+
     def __init__(self):
         default = dict(limit=0, remaining=5000, reset=0)
         self.slow = copy.deepcopy(default)
         self.medium = copy.deepcopy(default)
         self.default = copy.deepcopy(default)
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self._buckets = {
+            category: [float(default['remaining']), default['remaining'], now, 0]
+            for category in ['slow', 'medium', 'default']
+        }
+
+    def _refill(self, category):
+        """Refill the bucket of a category depending on the time elapsed
+        since its last refill and return it."""
+        bucket = self._buckets[category]
+        now = time.monotonic()
+        tokens, capacity, last, blocked_until = bucket
+        if blocked_until:
+            if now < blocked_until:
+                bucket[0] = 0
+            else:
+                bucket[0] = capacity
+                bucket[3] = 0
+        else:
+            bucket[0] = min(capacity,
+                            tokens + (now - last) * capacity / self.window)
+        bucket[2] = now
+        return bucket
+
+    @staticmethod
+    def _seconds_before_reset(reset):
+        """Convert the value of the X-Rate-Limit-Reset header into a number of
+        seconds. The header can either be a UNIX timestamp or a number of
+        seconds."""
+        now = time.time()
+        if reset > now / 2:
+            return reset - now
+        return reset
 
     def __repr__(self):
         log = []
@@ -86,19 +137,53 @@ class RateLimit:
         Returns:
             None:
         """
-        right_limit = getattr(self, RateConf.get_category(url))
-        right_limit['limit'] = int(data.get('X-Rate-Limit-Limit', right_limit['limit']))
-        right_limit['remaining'] = int(
-            data.get('X-Rate-Limit-Remaining', right_limit['remaining'])
-        )
-        right_limit['reset'] = int(data.get('X-Rate-Limit-Reset', right_limit['reset']))
+        category = RateConf.get_category(url)
+        right_limit = getattr(self, category)
+        with self._lock:
+            right_limit['limit'] = int(
+                data.get('X-Rate-Limit-Limit', right_limit['limit'])
+            )
+            right_limit['remaining'] = int(
+                data.get('X-Rate-Limit-Remaining', right_limit['remaining'])
+            )
+            right_limit['reset'] = int(
+                data.get('X-Rate-Limit-Reset', right_limit['reset'])
+            )
+            bucket = self._refill(category)
+            if right_limit['limit'] > 0:
+                bucket[1] = right_limit['limit']
+            bucket[0] = min(bucket[0], bucket[1], right_limit['remaining'])
+            if (right_limit['remaining'] <= 0 and
+                    data.get('X-Rate-Limit-Reset') is not None):
+                delay = self._seconds_before_reset(right_limit['reset'])
+                if delay > 0:
+                    bucket[0] = 0
+                    bucket[3] = time.monotonic() + delay
         return None
 
+    def acquire(self, url):
+        """Take a request from the remaining requests of the category of an
+        URL.
+
+        Args:
+            url (string): url which will be fectch by the pending request
+        Returns:
+            bool: False if no more request is available for this URL.
+        """
+        category = RateConf.get_category(url)
+        with self._lock:
+            bucket = self._refill(category)
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+        return True
+
     def is_reached(self, url):
         """Whether or not the current user can run some requests.
 
         Args:
             url (string): url which will be fectch by the pending request
         """
-        right_limit = getattr(self, RateConf.get_category(url))
-        return right_limit['remaining'] <= 0
+        category = RateConf.get_category(url)
+        with self._lock:
+            return self._refill(category)[0] < 1
@@ -2,10 +2,30 @@
 Some functions and classes used internally.
 """
 
+import json
 import re
-from lxml import html
+from functools import lru_cache
+from html import unescape
+from sys import intern
 
-from .misc import flat
+
+_TITLE_RE = re.compile(rb'<title[^>]*>([^<]*)</title>', re.I)
+_BODY_RE = re.compile(rb'<body[^>]*>(.*?)(?:</body>|$)', re.I | re.S)
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _build_one(cls, data, args, kwargs):
+    """Build one object from a dictionary."""
+    return cls(data, *args, **kwargs)
+
+
+def _build_many(cls, data, args, kwargs):
+    """Build a list of objects from a list of dictionaries."""
+    return [cls(item, *args, **kwargs) for item in data]
+
+
+_BUILDERS = {dict: _build_one, list: _build_many}
 
 
 def instance_builder(cls, data, *args, **kwargs):
@@ -15,11 +35,15 @@ def instance_builder(cls, data, *args, **kwargs):
     """
     if not data:
         return data
-    elif isinstance(data, dict):
-        return cls(data, *args, **kwargs)
-    elif isinstance(data, list):
-        return [cls(item, *args, **kwargs) for item in data]
-    raise TypeError
+    builder = _BUILDERS.get(type(data))
+    if builder is None:
+        if isinstance(data, dict):
+            builder = _build_one
+        elif isinstance(data, list):
+            builder = _build_many
+        else:
+            raise TypeError
+    return builder(cls, data, args, kwargs)
 
 
 class CallableDict(dict):
@@ -28,18 +52,26 @@ class CallableDict(dict):
     * it converts all the keys of data source into string
     * the key before a search will be converted into a string
     * if the value asked is not found, the value will be returned
+
+    The keys are interned when the object is built (keys added afterwards
+    are not).
     """
+    _prefix = 'focus_'
+
     def __init__(self, *datas):
         super().__init__()
+        _str = str
         for data in datas:
-            data = dict([(str(key), data[key]) for key in data])
-            self.update(data)
+            for key, value in data.items():
+                self[intern(key if type(key) is _str else _str(key))] = value
 
     def __missing__(self, key):
         return str(key)
 
     def __getitem__(self, key):
-        key = str(key).replace('focus_', '')
+        key = str(key)
+        if key.startswith(self._prefix):
+            key = intern(key[len(self._prefix):])
         return super().__getitem__(key)
 
     def __call__(self, key):
@@ -60,13 +92,13 @@ def id_to_value(data, dtype):
         the label.
     """
     if dtype == 'focuses':
-        return dict([
-            (str(focus['id']), focus['label']) for focus in data
-        ])
+        return {intern(str(focus['id'])): focus['label'] for focus in data}
     elif dtype == 'tags':
-        return dict(flat([[
-            (str(subtag['id']), subtag['value']) for subtag in tag.subtags
-        ] for tag in data]))
+        return {
+            intern(str(subtag['id'])): subtag['value']
+            for tag in data
+            for subtag in tag.subtags
+        }
     raise ValueError
 
 
@@ -75,13 +107,12 @@ def parse_struct_stat(stats):
     to return a pandas-compatible object.
     """
     data = dict()
-    for stat in stats:
-        for item in stats[stat]:
-            for metric in item['counts']:
-                data.setdefault(metric, dict())
-                data[metric].update({
-                    (stat, item['term']): item['counts'][metric]
-                })
+    setdefault = data.setdefault
+    for stat, items in stats.items():
+        for item in items:
+            term = item['term']
+            for metric, count in item['counts'].items():
+                setdefault(metric, {})[(stat, term)] = count
     return data
 
 
@@ -89,10 +120,11 @@ def parse_struct_interval(intervals):
     """Parse the response to get distribution which can be easily converted
     with pandas"""
     data = dict()
+    setdefault = data.setdefault
     for item in intervals:
-        for metric in item['counts']:
-            data.setdefault(metric, {})
-            data[metric].update({item['date']: item['counts'][metric]})
+        date = item['date']
+        for metric, count in item['counts'].items():
+            setdefault(metric, {})[date] = count
     return data
 
 
@@ -107,23 +139,59 @@ def _parse_error_response(response):
         dict: dictionary with information about the error,
         parsed from the content of th response
     """
-    error_data = dict()
     if response.ok:
-        return error_data
-    error_data['error_code'] = response.status_code
-    content_type = response.headers.get('Content-Type', '')
-    if content_type == 'text/html' or '<!DOCTYPE html>' in response.text:
-        document = html.fromstring(response.text)
-        error_data['error_type'] = document.xpath('//title/text()')[0]
+        return dict()
+    return dict(_parse_error_content(
+        response.status_code,
+        response.headers.get('Content-Type', ''),
+        response.content,
+        response.encoding or 'utf-8',
+    ))
+
+
+@lru_cache(maxsize=32)
+def _parse_error_content(status_code, content_type, content, encoding):
+    """Parse the content of an error response. The result is cached because
+    the same error is often returned several times in a row (for example
+    during a burst of requests with an expired token), so it must not be
+    modified."""
+    error_data = dict()
+    error_data['error_code'] = status_code
+    if content_type == 'text/html' or b'<!DOCTYPE html>' in content:
         try:
-            element = document.xpath("//body")[0]
-            message = element.text_content()
-        except IndexError:
-            message = ''
-        finally:
-            message = message.replace('\n', ' ')
-            message = re.sub(r'[ ]+', ' ', message).strip()
-            error_data['error_message'] = message
+            error_type, message = _extract_html_error(content, encoding)
+        except ValueError:
+            error_type, message = _extract_html_error_lxml(content, encoding)
+        error_data['error_type'] = error_type
+        error_data['error_message'] = _SPACES_RE.sub(' ', message).strip()
     elif content_type == 'application/json':
-        error_data.update(response.json())
+        error_data.update(json.loads(content.decode(encoding)))
     return error_data
+
+
+def _extract_html_error(content, encoding):
+    """Extract the title and the text of the body of an HTML error page with
+    regular expressions. Raises a ValueError if the page does not have the
+    expected structure."""
+    title = _TITLE_RE.search(content)
+    if title is None:
+        raise ValueError('No title found in the HTML page')
+    error_type = unescape(title.group(1).decode(encoding, 'replace'))
+    body = _BODY_RE.search(content)
+    if body is None:
+        return error_type, ''
+    message = _TAG_RE.sub('', body.group(1).decode(encoding, 'replace'))
+    return error_type, unescape(message)
+
+
+def _extract_html_error_lxml(content, encoding):
+    """Extract the title and the text of the body of a malformed HTML error
+    page using ``lxml``."""
+    from lxml import html
+    document = html.fromstring(content.decode(encoding, 'replace'))
+    error_type = document.xpath('//title/text()')[0]
+    try:
+        message = document.xpath("//body")[0].text_content()
+    except IndexError:
+        message = ''
+    return error_type, message
@@ -4,6 +4,7 @@ Hooks used to parse JSON data contained in the response of a request.
 
 import re
 from datetime import datetime
+from functools import lru_cache
 import json
 
 import pytz
@@ -12,6 +13,12 @@ from dateutil.parser import parse
 from .misc import to_snake_case
 
 
+_PATTERN_DATE = re.compile(
+    r'^ *\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}.\d{3}Z *$'
+)
+
+_snake_key = lru_cache(maxsize=4096)(to_snake_case)
+
 _BLACKLIST_PATH = [
     ['hits', 'radar', 'tag'],
     ['radar', 'tag'],
@@ -21,11 +28,9 @@ _BLACKLIST_PATH = [
 
 def decode_value(value, key=None):
     """Try to convert a string into a specific Python object"""
-    pattern_date = re.compile(
-        r'^ *\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}.\d{3}Z *$'
-    )
-
-    if isinstance(value, str) and pattern_date.match(value):
+    if not isinstance(value, str):
+        return value
+    if _PATTERN_DATE.match(value):
         return parse(value.strip(), ignoretz=True)
     elif key == 'timezone' and value in pytz.all_timezones_set:
         return pytz.timezone(value)
@@ -71,17 +76,21 @@ def snake_dict(data, blacklist=None, path=[]):
         object: the same object with all keys converted into snake cas format
             and some values converted into Python object.
     """
+    ignored = set(tuple(item) for item in blacklist or [])
+    return _snake_dict(data, ignored, tuple(path))
+
+
+def _snake_dict(data, ignored, path):
+    """Recursive part of ``snake_dict``. The path is a tuple and the
+    blacklist a set of tuples so that each dictionary is checked against the
+    blacklist with a single lookup."""
     if isinstance(data, list):
-        return [snake_dict(item,
-                           blacklist=blacklist,
-                           path=path) for item in data]
+        return [_snake_dict(item, ignored, path) for item in data]
 
-    if isinstance(data, dict) and path not in blacklist:
+    if isinstance(data, dict) and path not in ignored:
         return {
-            to_snake_case(key): snake_dict(data[key],
-                                           path=path + [key],
-                                           blacklist=blacklist)
-            for key in data
+            _snake_key(key): _snake_dict(value, ignored, path + (key,))
+            for key, value in data.items()
         }
 
     return decode_value(data, path[-1])
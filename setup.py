@@ -28,6 +28,10 @@ setup(
         'python-dateutil',
         'pycountry',
     ],
+    extras_require={
+        'fast': ['orjson'],
+        'stream': ['ijson'],
+    },
     include_package_data=True,
     keywords='radarly linkfluence api',
     license='Apache-2.0',